@@ -0,0 +1,277 @@
+# bench_checkin.py
+# 离线压测：用记录调用的假 Bot 会话驱动真实的 dp 处理器，不连网络、不连 Telegram。
+#
+# 用法:
+#   python bench_checkin.py                                  # 默认 2000 用户 / 50 群
+#   python bench_checkin.py --users 5000 --chats 200 --json out.json
+#   python bench_checkin.py --compare baseline.json          # 与基线对比，p99 / 吞吐退化超过阈值时退出码为 1
+#   python bench_checkin.py --database-url postgresql://localhost/checkin_bench   # 同样的场景跑 PostgreSQL 存储（用空库）
+#
+# 场景（依次执行，共用同一个临时数据库）:
+#   clock_in_storm   所有用户同时上班打卡
+#   break_burst      一部分用户同时开始休息，随后全部回座
+#   leaderboard_taps 随机用户点排行榜 / 今日统计
+#   report_run       为所有群生成并发送日报（子进程渲染）
+#   report_rerun     紧接着再发一次（数据未变，命中报表缓存，按 file_id 发送）
+#   clock_out_storm  所有用户下班签退
+# 每个场景输出：处理器延迟 p50/p99、吞吐、SQL 语句数（按首个关键字分类）、tracemalloc 峰值内存。
+# 出站限速（OutboundQueue）不接入假会话，测的是处理器本身的耗时。
+# SQL 数：SQLite 含 BEGIN / SAVEPOINT 等事务语句，PostgreSQL 只计业务语句。
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+from collections import Counter
+from time import monotonic, time as unix_time
+
+os.environ.setdefault("BOT_TOKEN", "1000000:bench")
+os.environ.setdefault("ADMIN_IDS", "1")
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(prefix="checkin_bench_"), "bench.db"))
+
+from aiogram import Bot, methods
+from aiogram.client.session.base import BaseSession
+from aiogram.types import ChatMemberMember, Update
+
+import telegram_checkin_pro as app
+
+CHAT_BASE = -1000000000000
+USER_BASE = 10000
+
+
+# ---------------------------
+# 假 Bot 会话：记录调用并返回最小合法结果
+# ---------------------------
+class RecordingSession(BaseSession):
+    def __init__(self):
+        super().__init__()
+        self.calls = Counter()
+        self._message_ids = itertools.count(1)
+
+    async def close(self):
+        pass
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+    async def make_request(self, bot, method, timeout=None):
+        name = type(method).__name__
+        self.calls[name] += 1
+        if isinstance(method, (methods.SendMessage, methods.SendPhoto, methods.SendDocument)):
+            result = {"message_id": next(self._message_ids), "date": int(unix_time()),
+                      "chat": {"id": method.chat_id, "type": "supergroup"}}
+            if isinstance(method, methods.SendDocument):
+                result["document"] = {"file_id": f"doc{result['message_id']}", "file_unique_id": "u"}
+            return method.__returning__.model_validate(result, context={"bot": bot})
+        if isinstance(method, methods.GetChatMember):
+            return ChatMemberMember.model_validate(
+                {"status": "member", "user": {"id": method.user_id, "is_bot": False, "first_name": f"u{method.user_id}"}})
+        if isinstance(method, methods.GetChat):
+            return method.__returning__.model_validate({"id": method.chat_id, "type": "supergroup", "title": "bench"})
+        return True
+
+
+# ---------------------------
+# 合成 update
+# ---------------------------
+_update_ids = itertools.count(1)
+
+def text_update(bot: Bot, chat_id: int, user_id: int, text: str, lang: str) -> Update:
+    return Update.model_validate({
+        "update_id": next(_update_ids),
+        "message": {
+            "message_id": 1,
+            "date": int(unix_time()),
+            "chat": {"id": chat_id, "type": "supergroup", "title": f"bench {chat_id}"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"u{user_id}", "language_code": lang},
+            "text": text,
+        },
+    }, context={"bot": bot})
+
+def menu_text(lang: str, row: int, col: int) -> str:
+    return app.LANG_TEXT[lang]["menu"][row][col]
+
+
+# ---------------------------
+# 统计
+# ---------------------------
+class QueryCounter:
+    def __init__(self):
+        self.counts = Counter()
+
+    def __call__(self, statement: str):
+        self.counts[statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "?"] += 1
+
+    def take(self) -> dict:
+        counts, self.counts = dict(self.counts), Counter()
+        return counts
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+async def feed_all(bot: Bot, updates, concurrency: int):
+    """并发喂入 update，返回每条的处理耗时（秒）"""
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def feed(update):
+        async with sem:
+            started = monotonic()
+            await app.dp.feed_update(bot, update)
+            latencies.append(monotonic() - started)
+
+    await asyncio.gather(*(feed(u) for u in updates))
+    return latencies
+
+async def measure(name: str, queries: QueryCounter, work) -> dict:
+    """执行一个场景；work() 返回处理器延迟列表（报表场景返回每群耗时）"""
+    queries.take()
+    tracemalloc.reset_peak()
+    mem_before = tracemalloc.get_traced_memory()[0]
+    started = monotonic()
+    latencies = await work()
+    elapsed = monotonic() - started
+    mem_now, mem_peak = tracemalloc.get_traced_memory()
+    counts = queries.take()
+    return {
+        "scenario": name,
+        "ops": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "queries": sum(counts.values()),
+        "queries_per_op": round(sum(counts.values()) / max(1, len(latencies)), 1),
+        "query_kinds": counts,
+        "mem_peak_kb": round((mem_peak - mem_before) / 1024, 1),
+        "mem_retained_kb": round((mem_now - mem_before) / 1024, 1),
+    }
+
+
+# ---------------------------
+# 场景
+# ---------------------------
+async def run_bench(args) -> list:
+    rnd = random.Random(args.seed)
+    langs = ["zh", "en", "id"]
+    users = [(CHAT_BASE - (i % args.chats), USER_BASE + i, langs[i % 3]) for i in range(args.users)]
+    chat_ids = sorted({chat for chat, _, _ in users})
+
+    session = RecordingSession()
+    bot = Bot(token=app.BOT_TOKEN, session=session)
+    app.bot = bot  # 报表、提醒、成员名查询都走全局 bot
+
+    if args.database_url:
+        app.storage = app.make_storage(args.database_url)
+    await app.storage.open()
+    await app.open_sessions.load()
+    await app.live_leaderboard.load()
+    app.start_report_executor()
+    # 预热渲染子进程，避免把进程启动时间算进 report_run
+    await asyncio.gather(*(app.render_report("xlsx", "warmup", []) for _ in range(app.REPORT_WORKERS)))
+    queries = QueryCounter()
+    await app.storage.set_trace_callback(queries)
+    tracemalloc.start()
+    results = []
+    try:
+        results.append(await measure("clock_in_storm", queries, lambda: feed_all(
+            bot, [text_update(bot, c, u, menu_text(l, 0, 0), l) for c, u, l in users], args.concurrency)))
+
+        breakers = rnd.sample(users, max(1, int(len(users) * args.break_ratio)))
+        break_cells = [(1, 0), (1, 1), (2, 0), (2, 1)]
+
+        async def break_burst():
+            starts = [text_update(bot, c, u, menu_text(l, *rnd.choice(break_cells)), l) for c, u, l in breakers]
+            returns = [text_update(bot, c, u, menu_text(l, 3, 0), l) for c, u, l in breakers]
+            return await feed_all(bot, starts, args.concurrency) + await feed_all(bot, returns, args.concurrency)
+        results.append(await measure("break_burst", queries, break_burst))
+
+        async def taps():
+            picks = [rnd.choice(users) for _ in range(args.taps)]
+            updates = [text_update(bot, c, u, menu_text(l, 4, 0) if i % 2 else menu_text(l, 3, 1), l)
+                       for i, (c, u, l) in enumerate(picks)]
+            return await feed_all(bot, updates, args.concurrency)
+        results.append(await measure("leaderboard_taps", queries, taps))
+
+        async def report_run():
+            summary = await app.run_reports(chat_ids, "daily", app.today_local_date())
+            if summary["failures"]:
+                print(f"报表失败: {summary['failures']}", file=sys.stderr)
+            return list(summary["timings"].values())
+        results.append(await measure("report_run", queries, report_run))
+        results.append(await measure("report_rerun", queries, report_run))
+
+        results.append(await measure("clock_out_storm", queries, lambda: feed_all(
+            bot, [text_update(bot, c, u, menu_text(l, 0, 1), l) for c, u, l in users], args.concurrency)))
+    finally:
+        tracemalloc.stop()
+        await app.storage.set_trace_callback(None)
+        app.stop_report_executor()
+        await app.storage.close()
+    print(f"Bot API 调用: {dict(session.calls)}")
+    return results
+
+
+def print_results(results: list):
+    header = f"{'场景':<18}{'次数':>7}{'耗时s':>9}{'ops/s':>10}{'p50ms':>9}{'p99ms':>9}{'SQL/次':>8}{'峰值KB':>10}"
+    print(header)
+    for r in results:
+        print(f"{r['scenario']:<18}{r['ops']:>7}{r['elapsed_s']:>9}{r['throughput']:>10}"
+              f"{r['p50_ms']:>9}{r['p99_ms']:>9}{r['queries_per_op']:>8}{r['mem_peak_kb']:>10}")
+
+def compare(results: list, baseline_path: str, threshold: float) -> bool:
+    """与基线对比：p99 变大或吞吐下降超过 threshold 倍即视为退化"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+    ok = True
+    for r in results:
+        base = baseline.get(r["scenario"])
+        if base is None:
+            continue
+        if base["p99_ms"] and r["p99_ms"] > base["p99_ms"] * threshold:
+            print(f"退化: {r['scenario']} p99 {base['p99_ms']} -> {r['p99_ms']} ms")
+            ok = False
+        if r["throughput"] and base["throughput"] > r["throughput"] * threshold:
+            print(f"退化: {r['scenario']} 吞吐 {base['throughput']} -> {r['throughput']} ops/s")
+            ok = False
+        if r["queries_per_op"] > base["queries_per_op"] * threshold:
+            print(f"退化: {r['scenario']} SQL/次 {base['queries_per_op']} -> {r['queries_per_op']}")
+            ok = False
+    return ok
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="打卡机器人离线压测")
+    parser.add_argument("--users", type=int, default=2000, help="合成用户数")
+    parser.add_argument("--chats", type=int, default=50, help="合成群数")
+    parser.add_argument("--concurrency", type=int, default=200, help="同时处理的 update 数")
+    parser.add_argument("--break-ratio", type=float, default=0.5, help="break_burst 中开始休息的用户比例")
+    parser.add_argument("--taps", type=int, default=2000, help="leaderboard_taps 的点击次数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", ""),
+                        help="PostgreSQL 连接串；为空则用临时 SQLite 文件")
+    parser.add_argument("--json", help="把结果写入 JSON 文件（可作为 --compare 的基线）")
+    parser.add_argument("--compare", help="与基线 JSON 对比")
+    parser.add_argument("--threshold", type=float, default=1.25, help="退化判定倍数")
+    return parser.parse_args(argv)
+
+def main(argv) -> int:
+    args = parse_args(argv)
+    results = asyncio.run(run_bench(args))
+    print_results(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+    if args.compare and not compare(results, args.compare, args.threshold):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
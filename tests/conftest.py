@@ -0,0 +1,35 @@
+# tests/conftest.py
+# 测试共用：导入前设置环境变量，提供指向临时文件的 SQLite 存储
+import asyncio
+import os
+import sys
+import tempfile
+
+os.environ.setdefault("BOT_TOKEN", "1000000:test")
+os.environ.setdefault("ADMIN_IDS", "1")
+os.environ.pop("DATABASE_URL", None)   # 模块级 storage 固定用 SQLite；PostgreSQL 用例见 CHECKIN_TEST_DATABASE_URL
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(prefix="checkin_test_"), "test.db"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import telegram_checkin_pro as app  # noqa: E402
+
+
+def sqlite_storage(path: str) -> "app.SQLiteStorage":
+    """使用模块全局连接池 / 写队列（写队列提交时读的是全局 db_pool），只把路径换成测试文件"""
+    app.db_pool.path = path
+    return app.SQLiteStorage(app.db_pool, app.write_queue)
+
+
+def run_app(monkeypatch, path: str, scenario):
+    """把模块全局 storage 换成 path 上的 SQLite 存储，在同一个事件循环里 open → scenario() → close"""
+    storage = sqlite_storage(path)
+    monkeypatch.setattr(app, "storage", storage)
+
+    async def main():
+        await storage.open()
+        try:
+            return await scenario()
+        finally:
+            await storage.close()
+
+    return asyncio.run(main())
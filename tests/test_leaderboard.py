@@ -0,0 +1,93 @@
+# tests/test_leaderboard.py
+# 内存排行榜与 LEADERBOARD_SQL 一致：随机的上下班 / 休息 / 重置序列，时间跨过当地午夜，每一步都比对
+import asyncio
+import random
+
+import pytest
+
+from conftest import app, run_app
+
+CHATS = (-1001, -1002)
+USERS = range(1, 31)
+BREAKS = ("smoke", "meal", "toilet_small", "toilet_big")
+
+
+class Clock:
+    def __init__(self, ts: int):
+        self.ts = ts
+
+    def __call__(self) -> float:
+        return self.ts
+
+    def today(self):
+        return app.local_date_of(self.ts)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(app.local_day_bounds(app.date(2024, 5, 10))[0] + 20 * 3600 + 17)
+    monkeypatch.setattr(app, "unix_time", clock)
+    monkeypatch.setattr(app, "today_local_date", clock.today)
+    for name, value in (("open_sessions", app.OpenSessions()), ("live_leaderboard", app.LiveLeaderboard()),
+                        ("report_cache", app.ReportCache()), ("reminder_scheduler", app.ReminderScheduler()),
+                        ("_settings_cache", {})):
+        monkeypatch.setattr(app, name, value)
+    return clock
+
+
+async def compare(chat_id: int, now: int):
+    day = app.today_local_date()
+    ws, we = app.local_day_bounds(day)
+    expected = {uid: (net, brk) for uid, net, brk in
+                await app.storage.leaderboard(chat_id, day.isoformat(), now, ws, we, 10_000)}
+    for limit in (1, 2, 5):
+        live = app.live_leaderboard.top(chat_id, limit, now)
+        sql = await app.storage.leaderboard(chat_id, day.isoformat(), now, ws, we, limit)
+        # 同分的先后不固定，比对分数序列和每个上榜用户的数值
+        assert [r[1] for r in live] == [r[1] for r in sql], (limit, live, sql)
+        assert len({r[0] for r in live}) == len(live)
+        assert all(expected[uid] == (net, brk) for uid, net, brk in live)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_live_leaderboard_matches_sql(seed, clock, tmp_path, monkeypatch):
+    rng = random.Random(seed)
+
+    async def step(action, *args):
+        clock.ts += rng.choice((1, 2, 3, 7, 13))
+        await action(*args)
+        for chat in CHATS:
+            await compare(chat, app.now_ts())
+
+    async def scenario():
+        await app.live_leaderboard.load()
+        first_day = app.today_local_date()
+        for _ in range(8):
+            chat_id = rng.choice(CHATS)
+            if rng.random() < 0.3:
+                await step(app.reset_leaderboard, chat_id)
+            # 一批人几秒内先后上班、过一阵又先后去休息：同组（增量相同）的截距挤在一两分钟内，
+            # 各人未结束会话的秒数零头不同，取整后的先后与截距的先后不一致
+            users = rng.sample(USERS, 12)
+            for user_id in users:
+                await step(app.start_work, user_id, chat_id)
+            clock.ts += rng.randrange(600, 3600)
+            for user_id in users[:9]:
+                await step(app.start_break, user_id, chat_id, rng.choice(BREAKS))
+            for _ in range(25):
+                user_id = rng.choice(USERS)
+                action = rng.random()
+                if action < 0.4:
+                    await step(asyncio.sleep, 0)
+                elif action < 0.55:
+                    await step(app.end_break, user_id, chat_id)
+                elif action < 0.7:
+                    await step(app.start_break, user_id, chat_id, rng.choice(BREAKS))
+                elif action < 0.85:
+                    await step(app.start_work, user_id, chat_id)
+                else:
+                    await step(app.end_work, user_id, chat_id)
+            clock.ts += rng.randrange(3600, 4 * 3600)
+        assert app.today_local_date() > first_day
+
+    run_app(monkeypatch, str(tmp_path / f"board{seed}.db"), scenario)
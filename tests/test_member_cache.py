@@ -0,0 +1,104 @@
+# tests/test_member_cache.py
+# 成员名 / 语言缓存：TTL 过期、容量淘汰、由消息 / 回调的 from_user 预热
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from conftest import app
+
+CHAT = -1001
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(app, "monotonic", clock)
+    return clock
+
+
+def user(user_id: int, lang=None, is_bot=False) -> "app.types.User":
+    return app.types.User(id=user_id, is_bot=is_bot, first_name=f"u{user_id}", language_code=lang)
+
+
+def message(sender) -> "app.types.Message":
+    return app.types.Message(message_id=1, date=datetime.now(timezone.utc),
+                             chat=app.types.Chat(id=CHAT, type="supergroup"), from_user=sender, text="hi")
+
+
+def test_ttl_expiry(clock):
+    cache = app.MemberCache(maxsize=10, ttl=60)
+    cache.put(CHAT, 1, "Alice", "zh")
+    clock.now += 59
+    assert cache.get(CHAT, 1) == ("Alice", "zh")
+    clock.now += 2
+    assert cache.get(CHAT, 1) is None
+    assert len(cache) == 0
+    # 重新写入刷新过期时间
+    cache.put(CHAT, 1, "Alice", "zh")
+    clock.now += 30
+    cache.put(CHAT, 1, "Alice Z", None)
+    clock.now += 45
+    assert cache.get(CHAT, 1) == ("Alice Z", None)
+
+
+def test_lru_eviction_at_maxsize(clock):
+    cache = app.MemberCache(maxsize=3, ttl=60)
+    for uid in (1, 2, 3):
+        cache.put(CHAT, uid, f"u{uid}", None)
+    assert cache.get(CHAT, 1) is not None       # 1 变成最近使用
+    cache.put(CHAT, 4, "u4", None)
+    assert len(cache) == 3
+    assert cache.get(CHAT, 2) is None           # 最久未用的被淘汰
+    assert [cache.get(CHAT, uid) is not None for uid in (1, 3, 4)] == [True, True, True]
+    # 同一用户在不同群是不同的键；上面按 1、3、4 的顺序读过，1 最久未用
+    cache.put(CHAT - 1, 1, "u1", None)
+    assert len(cache) == 3 and cache.get(CHAT, 1) is None
+
+
+def test_warm_up_from_message_and_callback(clock, monkeypatch):
+    monkeypatch.setattr(app, "member_cache", app.MemberCache(maxsize=10, ttl=60))
+    calls = []
+
+    class FakeBot:
+        async def get_chat_member(self, chat_id, user_id):
+            calls.append((chat_id, user_id))
+            # get_chat_member 返回的 User 没有 language_code
+            return app.types.ChatMemberMember(user=user(user_id))
+
+    monkeypatch.setattr(app, "bot", FakeBot())
+
+    async def handler(event, data):
+        return "handled"
+
+    async def scenario():
+        assert await app.remember_message_sender(handler, message(user(1, "id")), {}) == "handled"
+        assert await app.get_member_info(CHAT, 1) == ("u1", "id")
+
+        call = app.types.CallbackQuery(id="1", from_user=user(2, "zh-hans"), chat_instance="c",
+                                       message=message(user(99, is_bot=True)), data="x")
+        assert await app.remember_callback_sender(handler, call, {}) == "handled"
+        assert await app.get_member_info(CHAT, 2) == ("u2", "zh")
+        assert calls == []
+
+        # 机器人发的消息不预热；未命中时才请求 Telegram，且不覆盖已知语言
+        await app.remember_message_sender(handler, message(user(3, "en", is_bot=True)), {})
+        assert await app.get_member_info(CHAT, 3) == ("u3", None)
+        assert calls == [(CHAT, 3)]
+        # 过期后重新请求，语言要等下一条消息再补上
+        clock.now += 61
+        assert await app.get_member_info(CHAT, 1) == ("u1", None)
+        assert calls == [(CHAT, 3), (CHAT, 1)]
+        await app.remember_message_sender(handler, message(user(1, "id")), {})
+        app.member_cache.remember(CHAT, user(1))
+        assert await app.get_member_info(CHAT, 1) == ("u1", "id")
+
+    asyncio.run(scenario())
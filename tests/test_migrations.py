@@ -0,0 +1,75 @@
+# tests/test_migrations.py
+# 从最早版本（未设置 PRAGMA user_version，时间为 TEXT）的数据库升级
+import asyncio
+import sqlite3
+
+from conftest import app, sqlite_storage
+
+# 初版 init_db 建的表（没有 user_version，时间为 UTC 的 %Y-%m-%d %H:%M:%S 文本）
+BASELINE_SCHEMA = """
+CREATE TABLE work_sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, chat_id INTEGER,
+                            start_time TEXT, end_time TEXT);
+CREATE TABLE break_sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, chat_id INTEGER,
+                             type TEXT, start_time TEXT, end_time TEXT);
+CREATE TABLE settings (chat_id INTEGER PRIMARY KEY, reminder_text TEXT, reminder_media_file_id TEXT,
+                       weekly_report_enabled INTEGER DEFAULT 0, monthly_report_enabled INTEGER DEFAULT 0);
+CREATE TABLE admin_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, chat_id INTEGER, admin_id INTEGER,
+                         action TEXT, details TEXT, created_at TEXT);
+"""
+
+CHAT = -100
+USER = 7
+
+
+def make_baseline_db(path: str, sessions=True):
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    if sessions:
+        # 当地 2024-03-01 09:00 ~ 17:00 上班，中间 12:00 ~ 12:30 吃饭（UTC+7）
+        conn.execute("INSERT INTO work_sessions (user_id, chat_id, start_time, end_time) VALUES (?, ?, ?, ?)",
+                     (USER, CHAT, "2024-03-01 02:00:00", "2024-03-01 10:00:00"))
+        conn.execute("INSERT INTO break_sessions (user_id, chat_id, type, start_time, end_time) VALUES (?, ?, ?, ?, ?)",
+                     (USER, CHAT, "meal", "2024-03-01 05:00:00", "2024-03-01 05:30:00"))
+        # 未结束的上班不进汇总
+        conn.execute("INSERT INTO work_sessions (user_id, chat_id, start_time) VALUES (?, ?, ?)",
+                     (USER + 1, CHAT, "2024-03-02 02:00:00"))
+    conn.commit()
+    conn.close()
+
+
+def test_baseline_db_is_backfilled(tmp_path):
+    path = str(tmp_path / "baseline.db")
+    make_baseline_db(path)
+
+    async def scenario():
+        storage = sqlite_storage(path)
+        await storage.open()
+        try:
+            assert await storage.user_day(CHAT, USER, "2024-03-01") == (
+                480, 30, 1, 1, 30, 0, 0, 0, 0, 0, 0)
+            assert await storage.users_in_chat(CHAT, "2024-03-01") == [USER, USER + 1]
+            ws, we = app.local_day_bounds(app.date(2024, 3, 1))
+            board = await storage.leaderboard(CHAT, "2024-03-01", we, ws, we, 10)
+            assert board == [(USER, 450, 30)]
+        finally:
+            await storage.close()
+
+    asyncio.run(scenario())
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(app.MIGRATIONS)
+    conn.close()
+
+
+def test_empty_baseline_db_migrates(tmp_path):
+    path = str(tmp_path / "empty.db")
+    make_baseline_db(path, sessions=False)
+
+    async def scenario():
+        storage = sqlite_storage(path)
+        await storage.open()
+        try:
+            assert await storage.rollup_day("2024-03-01") == []
+        finally:
+            await storage.close()
+
+    asyncio.run(scenario())
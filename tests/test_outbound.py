@@ -0,0 +1,130 @@
+# tests/test_outbound.py
+# 出站队列：令牌桶补充、按优先级放行、单个聊天受限不挡住其他聊天、retry_after 暂停对应聊天
+import asyncio
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from conftest import app
+
+GROUP = -1001
+OTHER = -1002
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_refill(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(app, "monotonic", clock)
+    bucket = app.TokenBucket(3, 3.0)          # 每秒补 1 个
+    for _ in range(3):
+        assert bucket.ready_at(clock.now) <= clock.now
+        bucket.take()
+    assert bucket.ready_at(clock.now) == pytest.approx(clock.now + 1)
+    clock.now += 0.5
+    assert bucket.ready_at(clock.now) == pytest.approx(clock.now + 0.5)
+    clock.now += 0.5
+    assert bucket.ready_at(clock.now) == pytest.approx(clock.now)
+    # 空闲再久也只补到容量
+    clock.now += 100
+    assert bucket.ready_at(clock.now) <= clock.now and bucket.tokens == 3
+    assert bucket.idle(clock.now)
+    # retry_after：until 之前不放行，之后按速率重新补
+    bucket.pause(clock.now + 5)
+    assert bucket.ready_at(clock.now) == pytest.approx(clock.now + 6)
+    assert not bucket.idle(clock.now)
+    clock.now += 6
+    assert bucket.ready_at(clock.now) <= clock.now
+
+
+@pytest.fixture(autouse=True)
+def fast_group_limit(monkeypatch):
+    """群桶每 10ms 补一个令牌，用例只等 retry_after / pause 本身"""
+    monkeypatch.setattr(app, "OUTBOUND_GROUP_LIMIT", (5, 0.05))
+
+
+class FakeAPI:
+    """记录放行顺序；failures 中的 chat_id 第一次请求返回 retry_after"""
+
+    def __init__(self, failures=()):
+        self.sent = []
+        self.failures = set(failures)
+
+    async def __call__(self, bot, method):
+        if method.chat_id in self.failures:
+            self.failures.discard(method.chat_id)
+            raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=1)
+        self.sent.append((method.chat_id, method.text))
+        return True
+
+
+def send(queue: "app.OutboundQueue", api: FakeAPI, chat_id: int, text: str, priority: int = app.PRIORITY_INTERACTIVE):
+    with app.send_priority(priority):
+        return asyncio.create_task(queue(api, app.bot, SendMessage(chat_id=chat_id, text=text)))
+
+
+def test_priority_order_within_chat():
+    async def scenario():
+        queue, api = app.OutboundQueue(), FakeAPI()
+        try:
+            # 放行任务开始运行前全部入队
+            tasks = [send(queue, api, GROUP, "bulk1", app.PRIORITY_BULK),
+                     send(queue, api, GROUP, "reminder", app.PRIORITY_REMINDER),
+                     send(queue, api, GROUP, "reply1"),
+                     send(queue, api, GROUP, "bulk2", app.PRIORITY_BULK),
+                     send(queue, api, GROUP, "reply2")]
+            await asyncio.gather(*tasks)
+        finally:
+            await queue.stop()
+        assert [text for _, text in api.sent] == ["reply1", "reply2", "reminder", "bulk1", "bulk2"]
+        assert queue.sent == 5 and queue.depth() == {name: 0 for name in app.PRIORITY_NAMES.values()}
+
+    asyncio.run(scenario())
+
+
+def test_empty_bucket_does_not_block_other_chats():
+    async def scenario():
+        queue, api = app.OutboundQueue(), FakeAPI()
+        queue._bucket(GROUP).pause(app.monotonic() + 0.3)
+        try:
+            blocked = [send(queue, api, GROUP, f"g{i}", app.PRIORITY_INTERACTIVE) for i in range(3)]
+            other = send(queue, api, OTHER, "o", app.PRIORITY_BULK)
+            await other
+            assert api.sent == [(OTHER, "o")] and not any(t.done() for t in blocked)
+            assert queue.depth()["interactive"] == 3
+            # 等待中的请求被取消后不再发送
+            blocked[1].cancel()
+            await asyncio.gather(blocked[0], blocked[2])
+        finally:
+            await queue.stop()
+        assert api.sent == [(OTHER, "o"), (GROUP, "g0"), (GROUP, "g2")]
+
+    asyncio.run(scenario())
+
+
+def test_retry_after_pauses_chat():
+    async def scenario():
+        queue, api = app.OutboundQueue(), FakeAPI(failures=[GROUP])
+        try:
+            first = send(queue, api, GROUP, "g0")
+            await asyncio.sleep(0.05)
+            # GROUP 在 retry_after 期间暂停，其他聊天照常发送
+            assert queue._bucket(GROUP).ready_at(app.monotonic()) > app.monotonic() + 0.5
+            await send(queue, api, OTHER, "o")
+            assert api.sent == [(OTHER, "o")] and not first.done()
+            later = send(queue, api, GROUP, "g1")
+            await asyncio.gather(first, later)
+        finally:
+            await queue.stop()
+        # 重试沿用原序号，排在之后入队的请求前面
+        assert api.sent == [(OTHER, "o"), (GROUP, "g0"), (GROUP, "g1")]
+        assert queue.retry_after == 1 and queue.sent == 3 and queue.failed == 0
+
+    asyncio.run(scenario())
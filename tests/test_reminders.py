@@ -0,0 +1,114 @@
+# tests/test_reminders.py
+# 超时提醒调度：按截止时间顺序发送、回座取消、重启恢复（含错过提醒的宽限期与语言）
+import asyncio
+
+import pytest
+
+from conftest import app, run_app
+
+CHAT = -1001
+LIMIT = app.BREAK_LIMITS["smoke"] * 60
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """把发送换成记录 (chat_id, user_id, lang_hint)"""
+    calls = []
+
+    async def fake_send(chat_id, user_id, lang_hint):
+        await asyncio.sleep(0.01)
+        calls.append((chat_id, user_id, lang_hint))
+
+    monkeypatch.setattr(app, "send_overtime_reminder", fake_send)
+    return calls
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0.02)
+
+
+def test_sends_in_deadline_order(sent):
+    async def scenario():
+        scheduler = app.ReminderScheduler()
+        now = app.now_ts()
+        # 截止时间：用户 3 最早，其次 1、2；用户 4 还没到
+        scheduler.schedule(1, CHAT, 1, "smoke", now - LIMIT - 20, "zh")
+        scheduler.schedule(2, CHAT, 2, "smoke", now - LIMIT - 10, "en")
+        scheduler.schedule(3, CHAT, 3, "smoke", now - LIMIT - 30, "id")
+        scheduler.schedule(4, CHAT, 4, "smoke", now)
+        scheduler.start()
+        try:
+            await settle()
+            assert sent == [(CHAT, 3, "id"), (CHAT, 1, "zh"), (CHAT, 2, "en")]
+            assert len(scheduler) == 1
+            # 调度任务在等用户 4 时，新加入更早的截止时间会被唤醒
+            scheduler.schedule(5, CHAT, 5, "meal", now - 3600)
+            await settle()
+            assert sent[-1] == (CHAT, 5, None) and len(scheduler) == 1
+        finally:
+            await scheduler.stop()
+
+    asyncio.run(scenario())
+
+
+def test_cancel_user(sent):
+    async def scenario():
+        scheduler = app.ReminderScheduler()
+        now = app.now_ts()
+        scheduler.schedule(1, CHAT, 1, "smoke", now - LIMIT - 10)
+        scheduler.schedule(2, CHAT, 1, "meal", now - 3600)
+        scheduler.schedule(3, CHAT, 2, "smoke", now - LIMIT - 5)
+        scheduler.schedule(4, CHAT - 1, 1, "smoke", now - LIMIT - 5)
+        scheduler.cancel_user(CHAT, 1)
+        scheduler.cancel_user(CHAT, 99)
+        assert len(scheduler) == 2
+        scheduler.start()
+        try:
+            await settle()
+        finally:
+            await scheduler.stop()
+        assert sorted(sent) == [(CHAT - 1, 1, None), (CHAT, 2, None)]
+
+    asyncio.run(scenario())
+
+
+def test_stop_waits_for_sends_in_flight(sent):
+    async def scenario():
+        scheduler = app.ReminderScheduler()
+        scheduler.schedule(1, CHAT, 1, "smoke", app.now_ts() - LIMIT - 1)
+        scheduler.start()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        await scheduler.stop()
+        assert sent == [(CHAT, 1, None)]
+
+    asyncio.run(scenario())
+
+
+def test_rebuild_after_restart(sent, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "open_sessions", app.OpenSessions())
+    grace = app.REMINDER_MISSED_GRACE * 60
+
+    async def scenario():
+        now = app.now_ts()
+        s = app.storage
+        await s.start_break(CHAT, 1, "smoke", now, "id")                          # 还没到
+        await s.start_break(CHAT, 2, "smoke", now - LIMIT - grace + 60, "zh")     # 错过了，但在宽限期内
+        await s.start_break(CHAT, 3, "smoke", now - LIMIT - grace - 60, "zh")     # 错过太久，不再补发
+        await s.start_break(CHAT, 4, "smoke", now - LIMIT - 5)                    # 没记语言
+        ended = await s.start_break(CHAT, 5, "smoke", now - LIMIT - 5, "en")
+        await s.end_break(CHAT, 5, [(ended, "smoke", now - LIMIT - 5)], now)
+
+        await app.open_sessions.load()
+        scheduler = app.ReminderScheduler()
+        await scheduler.rebuild()
+        assert len(scheduler) == 3
+        scheduler.start()
+        try:
+            await settle()
+        finally:
+            await scheduler.stop()
+        assert sent == [(CHAT, 2, "zh"), (CHAT, 4, None)]
+
+    run_app(monkeypatch, str(tmp_path / "reminders.db"), scenario)
@@ -0,0 +1,177 @@
+# tests/test_report_cache.py
+# 报表缓存：数据版本、命中 / 淘汰、发送中的文件不被删除、file_id 失效后退回上传
+import asyncio
+import os
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+
+from conftest import app, run_app
+
+CHAT = -1001
+
+
+def ts_of(day, hour: int = 12) -> int:
+    return app.local_day_bounds(day)[0] + hour * 3600
+
+
+def entry_for(tmp_path, name: str) -> dict:
+    path = tmp_path / name
+    path.write_text(name)
+    return {"path": str(path), "filename": name, "caption": name, "file_id": None, "sending": 0, "dropped": False}
+
+
+def test_version_tracks_writes_per_day():
+    cache = app.ReportCache(days=10)
+    today = app.today_local_date()
+    yesterday = today - timedelta(days=1)
+    week = (today - timedelta(days=6), today)
+    assert cache.version(CHAT, *week) == 0
+
+    cache.touch(CHAT, ts_of(yesterday), ts_of(yesterday))
+    v1 = cache.version(CHAT, *week)
+    assert v1 > 0 and cache.version(CHAT, yesterday, yesterday) == v1
+    assert cache.version(CHAT, today, today) == 0
+    # 其他群的写入不影响本群；跨午夜的会话两天都变
+    cache.touch(CHAT - 1, ts_of(today), ts_of(today))
+    assert cache.version(CHAT, *week) == v1
+    cache.touch(CHAT, ts_of(yesterday, 23), ts_of(today, 1))
+    v2 = cache.version(CHAT, today, today)
+    assert v2 > v1 and cache.version(CHAT, yesterday, yesterday) == v2
+
+    # 超出逐日记录范围的窗口改用该群最近一次写入的序号
+    old = today - timedelta(days=30)
+    assert cache.version(CHAT, old, old) == v2
+    cache.touch(CHAT, ts_of(old), ts_of(old))
+    assert cache.version(CHAT, old, old) > v2 and cache.version(CHAT, today, today) == v2
+
+    cache.invalidate_chat(CHAT)
+    assert cache.version(CHAT, old, old) > v2
+    assert cache.version(CHAT, today, today) == 0
+
+
+def test_hit_miss_and_eviction(tmp_path):
+    cache = app.ReportCache(maxsize=2)
+    a, b, c = (entry_for(tmp_path, n) for n in ("a", "b", "c"))
+    cache.put((CHAT, "daily", 1), a)
+    cache.put((CHAT, "daily", 2), b)
+    assert cache.get((CHAT, "daily", 1)) is a and cache.get((CHAT, "weekly", 1)) is None
+    # a 刚用过，淘汰的是 b
+    cache.put((CHAT - 1, "daily", 3), c)
+    assert cache.get((CHAT, "daily", 2)) is None and not os.path.exists(b["path"])
+    assert len(cache) == 2
+    # 同一个键换成新条目时删掉旧文件
+    a2 = entry_for(tmp_path, "a2")
+    cache.put((CHAT, "daily", 1), a2)
+    assert cache.get((CHAT, "daily", 1)) is a2 and not os.path.exists(a["path"])
+    cache.invalidate_chat(CHAT)
+    assert len(cache) == 1 and not os.path.exists(a2["path"]) and os.path.exists(c["path"])
+    cache.clear()
+    assert len(cache) == 0 and not os.path.exists(c["path"])
+
+
+def test_file_kept_until_send_finishes(tmp_path):
+    cache = app.ReportCache(maxsize=1)
+    a, b = entry_for(tmp_path, "a"), entry_for(tmp_path, "b")
+    cache.put((CHAT, 1), a)
+    with cache.sending(a):
+        with cache.sending(a):
+            cache.put((CHAT, 2), b)          # 淘汰 a
+        assert os.path.exists(a["path"])
+    assert not os.path.exists(a["path"])
+    with cache.sending(b):
+        cache.invalidate_chat(CHAT)
+        assert os.path.exists(b["path"])
+    assert not os.path.exists(b["path"])
+
+
+class FakeBot:
+    """send_document：按 file_id 发送时 file_id 在 bad_ids 中就失败；上传时读出文件内容，返回新的 file_id"""
+
+    def __init__(self, bad_ids=(), during_upload=None):
+        self.calls = []
+        self.bad_ids = set(bad_ids)
+        self.during_upload = during_upload
+        self.uploads = 0
+
+    async def send_document(self, chat_id, document, caption=None):
+        if isinstance(document, str):
+            self.calls.append(("file_id", chat_id, document))
+            if document in self.bad_ids:
+                raise RuntimeError("wrong file identifier")
+            return SimpleNamespace(document=SimpleNamespace(file_id=document))
+        if self.during_upload is not None:
+            self.during_upload()
+        await asyncio.sleep(0)
+        with open(document.path, "rb") as f:
+            f.read()
+        self.uploads += 1
+        self.calls.append(("upload", chat_id, document.filename))
+        return SimpleNamespace(document=SimpleNamespace(file_id=f"id{self.uploads}"))
+
+    async def get_chat(self, chat_id):
+        return SimpleNamespace(title="测试群")
+
+    async def get_chat_member(self, chat_id, user_id):
+        raise RuntimeError("not needed")
+
+
+def test_send_falls_back_to_upload(tmp_path, monkeypatch):
+    entry = entry_for(tmp_path, "r.xlsx")
+    fake = FakeBot(bad_ids={"id1"})
+    monkeypatch.setattr(app, "bot", fake)
+
+    async def scenario():
+        await app.send_report_document(1, entry)           # 没有 file_id：上传
+        assert entry["file_id"] == "id1"
+        await app.send_report_document(2, entry)           # file_id 失效：退回上传并换成新的
+        assert entry["file_id"] == "id2"
+        await app.send_report_document(3, entry)
+        assert entry["file_id"] == "id2"
+
+        # 限流不退回上传，由出站队列重试
+        async def retry_after(*args, **kwargs):
+            raise TelegramRetryAfter(method=None, message="Too Many Requests", retry_after=1)
+
+        monkeypatch.setattr(fake, "send_document", retry_after)
+        with pytest.raises(TelegramRetryAfter):
+            await app.send_report_document(4, entry)
+        assert entry["file_id"] == "id2"
+
+    asyncio.run(scenario())
+    assert fake.calls == [("upload", 1, "r.xlsx"), ("file_id", 2, "id1"), ("upload", 2, "r.xlsx"), ("file_id", 3, "id2")]
+
+
+def test_send_report_for_chat_reuses_entry(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "ADMIN_IDS", [1, 2])
+    monkeypatch.setattr(app, "report_cache", app.ReportCache())
+    monkeypatch.setattr(app, "open_sessions", app.OpenSessions())
+    monkeypatch.setattr(app, "_settings_cache", {})
+    fake = FakeBot()
+    monkeypatch.setattr(app, "bot", fake)
+    day = app.today_local_date() - timedelta(days=1)
+
+    async def scenario():
+        work_id = await app.storage.start_work(CHAT, 7, ts_of(day, 9))
+        await app.storage.end_work(CHAT, 7, [(work_id, ts_of(day, 9))], ts_of(day, 17))
+
+        await app.send_report_for_chat(CHAT, "daily", day)
+        await app.send_report_for_chat(CHAT, "daily", day)
+        assert fake.uploads == 1 and len(app.report_cache) == 1
+        (entry,) = app.report_cache._entries.values()
+
+        # 上传途中条目失效（如重置排行榜）：文件等这次发送结束再删
+        app.report_cache.touch(CHAT, ts_of(day), ts_of(day))
+        fake.during_upload = lambda: app.report_cache.invalidate_chat(CHAT)
+        await app.send_report_for_chat(CHAT, "daily", day)
+        assert fake.uploads == 2 and len(app.report_cache) == 0
+        assert not os.path.exists(entry["path"])
+        assert not os.listdir(os.path.dirname(entry["path"]))
+
+    try:
+        run_app(monkeypatch, str(tmp_path / "reports.db"), scenario)
+    finally:
+        app.stop_report_executor()
+    assert [c[0] for c in fake.calls] == ["upload", "file_id", "file_id", "file_id", "upload", "file_id"]
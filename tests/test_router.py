@@ -0,0 +1,84 @@
+# tests/test_router.py
+# 文本路由：三种语言的每个菜单按钮经 dp.feed_update 到达对应处理器，其他文本不触发任何处理器
+import asyncio
+from itertools import count
+from time import time as unix_time
+
+import pytest
+
+from conftest import app
+
+CHAT = -1001
+_update_ids = count(1)
+
+
+def text_update(text: str, chat_id: int = CHAT) -> "app.types.Update":
+    return app.types.Update.model_validate({
+        "update_id": next(_update_ids),
+        "message": {
+            "message_id": 1,
+            "date": int(unix_time()),
+            "chat": {"id": chat_id, "type": "supergroup", "title": "router"},
+            "from": {"id": 7, "is_bot": False, "first_name": "u7"},
+            "text": text,
+        },
+    }, context={"bot": app.bot})
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """把各处理器换成记录 (动作, 语言, 休息类型)"""
+    calls = []
+
+    def recorder(action):
+        async def handler(message, lang):
+            calls.append((action, lang, None))
+        return handler
+
+    for action in app.TEXT_HANDLERS:
+        monkeypatch.setitem(app.TEXT_HANDLERS, action, recorder(action))
+
+    async def start_break(message, lang, btype):
+        calls.append(("start_break", lang, btype))
+
+    async def admin_input(message):
+        calls.append(("admin_input", None, None))
+
+    monkeypatch.setattr(app, "handler_start_break", start_break)
+    monkeypatch.setattr(app, "handle_admin_input", admin_input)
+    monkeypatch.setattr(app, "member_cache", app.MemberCache())
+    return calls
+
+
+def feed(*updates):
+    async def main():
+        for update in updates:
+            await app.dp.feed_update(app.bot, update)
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("lang", ["zh", "en", "id"])
+def test_menu_labels_reach_their_handlers(lang, calls):
+    expected = []
+    labels = []
+    for texts, actions in zip(app.LANG_TEXT[lang]["menu"], app.MENU_ACTIONS):
+        for text, (action, btype) in zip(texts, actions):
+            labels.append(text)
+            expected.append((action, lang, btype))
+    labels += [app.LANG_TEXT[lang]["adm_send_daily"], app.MANUAL_DAILY_PHRASES[lang]]
+    expected += [("manual_daily", lang, None)] * 2
+
+    feed(*(text_update(text) for text in labels))
+    assert calls == expected
+    assert {action for action, _, _ in calls} == set(app.TEXT_HANDLERS) | {"start_break"}
+
+
+def test_unrelated_text_falls_through(calls, monkeypatch):
+    monkeypatch.setattr(app, "pending_media_for_chat", {})
+    feed(text_update("hello"), text_update("🏁 上班打卡 "), text_update("clock in"))
+    assert calls == []
+    # 管理员正在设置提醒文字时，普通文本交给 handle_admin_input
+    app.pending_media_for_chat[CHAT] = "text"
+    feed(text_update("hello"))
+    assert calls == [("admin_input", None, None)]
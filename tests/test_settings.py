@@ -0,0 +1,60 @@
+# tests/test_settings.py
+# 群设置缓存：命中时不查库，set_chat_setting 写穿透到库并更新缓存
+import pytest
+
+from conftest import app, run_app
+
+CHAT = -1001
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(monkeypatch):
+    monkeypatch.setattr(app, "_settings_cache", {})
+
+
+def test_cache_hit_skips_sqlite(tmp_path, monkeypatch):
+    statements = []
+
+    async def scenario():
+        first = await app.get_chat_settings(CHAT)
+        assert first["weekly_report_enabled"] == 0
+        await app.storage.set_trace_callback(statements.append)
+        try:
+            for _ in range(5):
+                assert await app.get_chat_settings(CHAT) == first
+            assert statements == []
+            # 未缓存的群首次读取才查库
+            await app.get_chat_settings(CHAT - 1)
+            assert any("FROM settings" in s for s in statements)
+        finally:
+            await app.storage.set_trace_callback(None)
+
+    run_app(monkeypatch, str(tmp_path / "settings.db"), scenario)
+
+
+def test_set_chat_setting_writes_through(tmp_path, monkeypatch):
+    path = str(tmp_path / "settings.db")
+
+    async def scenario():
+        await app.get_chat_settings(CHAT)
+        await app.set_chat_setting(CHAT, "weekly_report_enabled", 1)
+        await app.set_chat_setting(CHAT, "reminder_text", "回座")
+        settings = await app.get_chat_settings(CHAT)
+        assert settings["weekly_report_enabled"] == 1 and settings["reminder_text"] == "回座"
+        assert await app.get_chats_with_setting_enabled("weekly_report_enabled") == [CHAT]
+        # 返回的是副本，改它不影响缓存
+        settings["reminder_text"] = None
+        assert (await app.get_chat_settings(CHAT))["reminder_text"] == "回座"
+        with pytest.raises(ValueError):
+            await app.set_chat_setting(CHAT, "no_such_column", 1)
+
+    run_app(monkeypatch, path, scenario)
+
+    # 重新打开、清空缓存后从库里读到的是写入的值
+    monkeypatch.setattr(app, "_settings_cache", {})
+
+    async def reload():
+        return await app.get_chat_settings(CHAT)
+
+    settings = run_app(monkeypatch, path, reload)
+    assert settings["weekly_report_enabled"] == 1 and settings["reminder_text"] == "回座"
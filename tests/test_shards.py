@@ -0,0 +1,148 @@
+# tests/test_shards.py
+# 分片模式：单库拆分为分片文件、启动检查、工作进程监督
+import asyncio
+import multiprocessing
+import sqlite3
+import time
+from datetime import date
+
+import pytest
+
+from conftest import app, sqlite_storage
+
+CHATS = [-1001, -1002, -1003, 42]
+DAY = 86400
+OLD = 1_700_000_000          # 归档月份里的会话
+RECENT = OLD + 200 * DAY
+
+
+def session_counts(path: str) -> dict:
+    conn = sqlite3.connect(path)
+    counts = {}
+    tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE '%sessions%'")]
+    for table in tables:
+        for chat_id, n in conn.execute(f"SELECT chat_id, COUNT(*) FROM {table} GROUP BY chat_id"):
+            counts[chat_id] = counts.get(chat_id, 0) + n
+    conn.close()
+    return counts
+
+
+async def seed(storage):
+    await storage.open()
+    try:
+        for i, chat_id in enumerate(CHATS):
+            for base in (OLD, RECENT):
+                sid = await storage.start_work(chat_id, 7, base + i * 60)
+                bid = await storage.start_break(chat_id, 7, "smoke", base + i * 60 + 600)
+                await storage.end_break(chat_id, 7, [(bid, "smoke", base + i * 60 + 600)], base + i * 60 + 900)
+                await storage.end_work(chat_id, 7, [(sid, base + i * 60)], base + i * 60 + 3600)
+            await storage.load_settings(chat_id)
+        await storage.archive_sessions(OLD + 30 * DAY)
+    finally:
+        await storage.close()
+
+
+def test_split_into_shards(tmp_path, monkeypatch):
+    path = str(tmp_path / "main.db")
+    monkeypatch.setattr(app, "DB_PATH", path)
+    monkeypatch.setattr(app, "storage", sqlite_storage(path))
+    asyncio.run(seed(app.storage))
+
+    with pytest.raises(RuntimeError, match="split-shards"):
+        asyncio.run(app.storage.check_shards(3))
+    asyncio.run(app.storage.split_into_shards(3))
+    asyncio.run(app.storage.check_shards(3))
+    with pytest.raises(RuntimeError, match="已存在"):
+        asyncio.run(app.storage.split_into_shards(3))
+
+    for index in range(3):
+        shard = app.shard_db_path(index)
+        expected = {c: 4 for c in CHATS if app.shard_of(c, 3) == index}
+        assert session_counts(shard) == expected
+        conn = sqlite3.connect(shard)
+        assert {r[0] for r in conn.execute("SELECT chat_id FROM settings")} == set(expected)
+        assert {r[0] for r in conn.execute("SELECT chat_id FROM daily_user_stats")} == set(expected)
+        conn.close()
+
+    # 分片文件可以直接打开，归档月份的会话仍能读到
+    async def read_shard():
+        storage = app.storage
+        storage.use_shard(app.shard_of(CHATS[0], 3))
+        await storage.open()
+        try:
+            rows = [r async for r in storage.iter_sessions("work", CHATS[0], OLD - DAY, RECENT + DAY)]
+        finally:
+            await storage.close()
+            storage.use_shard(None)
+        return rows
+
+    assert len(asyncio.run(read_shard())) == 2
+
+
+def test_check_shards_allows_fresh_install(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "DB_PATH", str(tmp_path / "none.db"))
+    asyncio.run(app.storage.check_shards(2))
+
+
+def idle_worker(*args):
+    time.sleep(60)
+
+
+def test_supervise_restarts_dead_worker(monkeypatch):
+    ctx = multiprocessing.get_context("spawn")
+    monkeypatch.setattr(app, "SHARD_CHECK_INTERVAL", 0.05)
+    monkeypatch.setattr(app.ShardFront, "_spawn", lambda self, index: ctx.Process(target=idle_worker, daemon=True))
+
+    async def scenario():
+        front = app.ShardFront(2)
+        for proc in front.procs:
+            proc.start()
+        try:
+            done = asyncio.get_running_loop().create_future()
+            front._pending[1] = ({1: {"total": 0, "failures": {}, "timings": {}, "elapsed": 0.0}}, done)
+            dead, old_inbox = front.procs[0], front.inboxes[0]
+            dead.kill()
+            dead.join()
+            watcher = asyncio.create_task(front.supervise())
+            await asyncio.wait_for(done, timeout=5)
+            results, _ = front._pending[1]
+            assert "exitcode" in results[0]["error"]
+            assert front.procs[0] is not dead and front.procs[0].is_alive()
+            assert front.inboxes[0] is not old_inbox
+
+            # 短时间内反复退出：监督抛出异常
+            monkeypatch.setattr(app, "SHARD_MAX_RESTARTS", 1)
+            front.procs[1].kill()
+            with pytest.raises(RuntimeError, match="退出"):
+                await asyncio.wait_for(watcher, timeout=5)
+        finally:
+            for proc in front.procs:
+                proc.kill()
+                proc.join()
+
+    asyncio.run(scenario())
+
+
+def test_stop_cancels_manual_reports(monkeypatch):
+    ctx = multiprocessing.get_context("spawn")
+    monkeypatch.setattr(app.ShardFront, "_spawn", lambda self, index: ctx.Process(target=idle_worker, daemon=True))
+
+    async def scenario():
+        front = app.ShardFront(2)
+        front.start()
+        try:
+            # 工作进程转来的手动日报请求：前端广播后等各分片汇总
+            front.outbox.put(("run_reports", "daily", date(2024, 5, 10), (-1001, 1, "zh")))
+            for _ in range(100):
+                if front._manual:
+                    break
+                await asyncio.sleep(0.05)
+            (task,) = front._manual
+            assert not task.done() and len(front._pending) == 1
+        finally:
+            for proc in front.procs:
+                proc.kill()
+        await asyncio.wait_for(front.stop(), timeout=10)
+        assert task.cancelled() and not front._manual and not front._pending
+
+    asyncio.run(scenario())
@@ -0,0 +1,258 @@
+# tests/test_storage.py
+# Storage 接口契约：同一组用例分别跑 SQLiteStorage 与 PostgresStorage，返回值（含类型）必须一致。
+# PostgreSQL 用例需要设置 CHECKIN_TEST_DATABASE_URL（每个用例开始前会清空该库的 public schema，请用专门的测试库），
+# 未设置时跳过。
+import asyncio
+import os
+from datetime import date
+
+import pytest
+
+from conftest import app, sqlite_storage
+
+PG_DSN = os.getenv("CHECKIN_TEST_DATABASE_URL", "")
+
+CHAT = -1001
+OTHER_CHAT = -1002
+ALICE = 11
+BOB = 12
+DAY = date(2024, 5, 10)
+DAY_START, DAY_END = app.local_day_bounds(DAY)   # 当地 00:00 / 23:59:59 的 epoch 秒
+HOUR = 3600
+
+
+async def reset_pg():
+    conn = await app.asyncpg.connect(PG_DSN)
+    try:
+        await conn.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public")
+    finally:
+        await conn.close()
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def make(request, tmp_path):
+    if request.param == "sqlite":
+        return lambda: sqlite_storage(str(tmp_path / "contract.db"))
+    if not PG_DSN:
+        pytest.skip("未设置 CHECKIN_TEST_DATABASE_URL")
+    if app.asyncpg is None:
+        pytest.skip("未安装 asyncpg")
+    asyncio.run(reset_pg())
+    return lambda: app.PostgresStorage(PG_DSN)
+
+
+def run(make, scenario):
+    async def main():
+        storage = make()
+        await storage.open()
+        try:
+            return await scenario(storage)
+        finally:
+            await storage.close()
+
+    return asyncio.run(main())
+
+
+def counters(**values) -> tuple:
+    return tuple(values.get(c, 0) for c in app.ROLLUP_COUNTERS)
+
+
+def assert_ints(rows):
+    for row in rows:
+        for value in row:
+            assert value is None or type(value) in (int, str), (row, type(value))
+
+
+def test_work_and_break_sessions(make):
+    t0 = DAY_START + 9 * HOUR
+
+    async def scenario(s):
+        work_id = await s.start_work(CHAT, ALICE, t0)
+        break_id = await s.start_break(CHAT, ALICE, "smoke", t0 + HOUR, "id")
+        work, breaks = await s.all_open_sessions()
+        assert work == [(work_id, CHAT, ALICE, t0)]
+        assert breaks == [(break_id, CHAT, ALICE, "smoke", t0 + HOUR)]
+        assert await s.open_break_langs() == {break_id: "id"}
+
+        await s.end_break(CHAT, ALICE, [(break_id, "smoke", t0 + HOUR)], t0 + HOUR + 600)
+        # 已结束的会话再结束一次不重复计入汇总
+        await s.end_break(CHAT, ALICE, [(break_id, "smoke", t0 + HOUR)], t0 + 2 * HOUR)
+        await s.end_work(CHAT, ALICE, [(work_id, t0)], t0 + 8 * HOUR)
+        await s.end_work(CHAT, ALICE, [(work_id, t0)], t0 + 9 * HOUR)
+
+        assert await s.all_open_sessions() == ([], [])
+        assert await s.open_break_langs() == {}
+        row = await s.user_day(CHAT, ALICE, DAY.isoformat())
+        assert row == counters(work_min=480, break_min=10, break_cnt=1, smoke_cnt=1, smoke_min=10)
+        assert_ints([row])
+        assert await s.user_day(CHAT, BOB, DAY.isoformat()) is None
+        assert await s.rollup_day(DAY.isoformat()) == [(CHAT, ALICE, 480, 10, 1)]
+        assert await s.active_chat_ids() == [CHAT]
+
+    run(make, scenario)
+
+
+def test_rollup_splits_at_local_midnight(make):
+    start = DAY_END + 1 - 2 * HOUR          # 当地 22:00
+    end = DAY_END + 1 + 3 * HOUR            # 次日 03:00
+    next_day = date.fromordinal(DAY.toordinal() + 1).isoformat()
+
+    async def scenario(s):
+        work_id = await s.start_work(CHAT, ALICE, start)
+        break_id = await s.start_break(CHAT, ALICE, "meal", start + HOUR)    # 23:00 ~ 次日 00:30
+        await s.end_break(CHAT, ALICE, [(break_id, "meal", start + HOUR)], DAY_END + 1 + 1800)
+        await s.end_work(CHAT, ALICE, [(work_id, start)], end)
+        # 第二段上班落在同一天，按主键累加到同一行
+        second = await s.start_work(CHAT, ALICE, end + HOUR)
+        await s.end_work(CHAT, ALICE, [(second, end + HOUR)], end + 2 * HOUR)
+
+        assert await s.user_day(CHAT, ALICE, DAY.isoformat()) == counters(
+            work_min=120, break_min=60, break_cnt=1, meal_cnt=1, meal_min=60)
+        # 跨午夜的休息只在开始那天计次数
+        assert await s.user_day(CHAT, ALICE, next_day) == counters(work_min=240, break_min=30, meal_min=30)
+
+        rows, open_work, open_breaks = await s.rollup_range(CHAT, DAY.isoformat(), next_day, end + 2 * HOUR)
+        assert rows == [(ALICE, start, end + 2 * HOUR, 360, 90, 1)]
+        assert (open_work, open_breaks) == ([], [])
+        assert_ints(rows)
+
+    run(make, scenario)
+
+
+def test_leaderboard(make):
+    t0 = DAY_START + 8 * HOUR
+    now = t0 + 4 * HOUR
+
+    async def scenario(s):
+        alice = await s.start_work(CHAT, ALICE, t0)
+        await s.end_work(CHAT, ALICE, [(alice, t0)], t0 + 3 * HOUR)
+        pause = await s.start_break(CHAT, ALICE, "toilet_small", t0 + HOUR)
+        await s.end_break(CHAT, ALICE, [(pause, "toilet_small", t0 + HOUR)], t0 + HOUR + 300)
+        # Bob 仍在上班，且正在休息：按 now 计入
+        await s.start_work(CHAT, BOB, t0 + HOUR)
+        await s.start_break(CHAT, BOB, "smoke", now - 600)
+        # 只有休息没有上班的用户不上榜；其他群不影响
+        await s.start_break(CHAT, 13, "smoke", t0)
+        other = await s.start_work(OTHER_CHAT, ALICE, t0)
+        await s.end_work(OTHER_CHAT, ALICE, [(other, t0)], now)
+
+        board = await s.leaderboard(CHAT, DAY.isoformat(), now, DAY_START, DAY_END, 10)
+        assert board == [(ALICE, 175, 5), (BOB, 170, 10)]
+        assert_ints(board)
+        assert await s.leaderboard(CHAT, DAY.isoformat(), now, DAY_START, DAY_END, 1) == [(ALICE, 175, 5)]
+        assert sorted(await s.users_in_chat(CHAT, DAY.isoformat())) == [ALICE, BOB]
+
+    run(make, scenario)
+
+
+def test_reset_chat(make):
+    t0 = DAY_START + 8 * HOUR
+    reset_at = t0 + 2 * HOUR
+
+    async def scenario(s):
+        before = await s.start_work(CHAT, ALICE, t0 - 86400)
+        await s.end_work(CHAT, ALICE, [(before, t0 - 86400)], t0 - 86400 + HOUR)
+        done = await s.start_work(CHAT, ALICE, t0)
+        await s.end_work(CHAT, ALICE, [(done, t0)], t0 + HOUR)
+        await s.start_work(CHAT, BOB, t0)
+        await s.start_break(CHAT, BOB, "meal", t0 + HOUR)
+        keep = await s.start_work(OTHER_CHAT, ALICE, t0)
+
+        await s.reset_chat(CHAT, reset_at)
+
+        # 未结束的会话在 reset_at 结束，不计入汇总；当天汇总清空，之前日期保留
+        work, breaks = await s.all_open_sessions()
+        assert work == [(keep, OTHER_CHAT, ALICE, t0)] and breaks == []
+        assert await s.user_day(CHAT, ALICE, DAY.isoformat()) is None
+        yesterday = date.fromordinal(DAY.toordinal() - 1).isoformat()
+        assert await s.user_day(CHAT, ALICE, yesterday) == counters(work_min=60)
+        assert (await s.load_settings(CHAT))[app.SETTINGS_COLUMNS.index("reset_at")] == reset_at
+        # 历史会话本身保留
+        rows = [r async for r in s.iter_sessions("work", CHAT, t0 - 86400, DAY_END)]
+        assert len(rows) == 3
+
+        # 重置后新的会话照常计入；rebuild 跳过 reset_at 之前开始的会话
+        after = await s.start_work(CHAT, BOB, reset_at + HOUR)
+        await s.end_work(CHAT, BOB, [(after, reset_at + HOUR)], reset_at + 2 * HOUR)
+        assert await s.rollup_day(DAY.isoformat()) == [(CHAT, BOB, 60, 0, 1)]
+        await s.rebuild_daily_stats()
+        assert await s.rollup_day(DAY.isoformat()) == [(CHAT, BOB, 60, 0, 1)]
+
+    run(make, scenario)
+
+
+def test_archive_and_iter_sessions(make):
+    old = DAY_START - 120 * 86400
+    window = (old - 86400, DAY_END)
+
+    async def scenario(s):
+        ids = []
+        for i, start in enumerate((old, old + 40 * 86400, DAY_START + HOUR)):
+            work_id = await s.start_work(CHAT, ALICE, start)
+            break_id = await s.start_break(CHAT, ALICE, "smoke", start + 600)
+            await s.end_break(CHAT, ALICE, [(break_id, "smoke", start + 600)], start + 900)
+            if i < 2:
+                await s.end_work(CHAT, ALICE, [(work_id, start)], start + HOUR)
+            ids.append(work_id)
+        before = sorted([r async for r in s.iter_sessions("work", CHAT, *window)])
+        before_breaks = sorted([r async for r in s.iter_sessions("break", CHAT, *window)])
+        rollup_before = await s.user_day(CHAT, ALICE, app.local_date_of(old).isoformat())
+
+        # 两个月份各 1 条上班 + 1 条休息；未结束的和近期的留在热表
+        assert await s.archive_sessions(DAY_START - 30 * 86400) == 4
+        assert await s.archive_sessions(DAY_START - 30 * 86400) == 0
+
+        assert sorted([r async for r in s.iter_sessions("work", CHAT, *window)]) == before
+        assert sorted([r async for r in s.iter_sessions("break", CHAT, *window)]) == before_breaks
+        assert len(before) == 3 and before[-1][2] is None
+        # 只读近期窗口时不涉及归档月份
+        assert [r async for r in s.iter_sessions("work", CHAT, DAY_START, DAY_END)] == [(ALICE, DAY_START + HOUR, None)]
+        work, _ = await s.all_open_sessions()
+        assert work == [(ids[2], CHAT, ALICE, DAY_START + HOUR)]
+        # 汇总不受归档影响，rebuild 也读归档表
+        await s.rebuild_daily_stats()
+        assert await s.user_day(CHAT, ALICE, app.local_date_of(old).isoformat()) == rollup_before
+
+    run(make, scenario)
+
+
+def test_single_owner(make, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "DB_PATH", str(tmp_path / "owner.db"))
+
+    async def claim(storage, *args):
+        if args:
+            storage.use_shard(args[0])
+        await storage.claim_owner(*args)
+        return storage
+
+    async def scenario():
+        first = await claim(make())
+        with pytest.raises(RuntimeError):
+            await claim(make())
+        await first.close()
+        # 释放后可以重新占用
+        again = await claim(make())
+        await again.close()
+
+        # 同一分片数的不同分片可以并存，同一分片不行
+        shard0 = await claim(make(), 0, 2)
+        shard1 = await claim(make(), 1, 2)
+        with pytest.raises(RuntimeError):
+            await claim(make(), 1, 2)
+        if isinstance(shard0, app.PostgresStorage):
+            # 不同分片数负责的群重叠（SQLite 的分片是不同文件，由 check_shards 把关）
+            with pytest.raises(RuntimeError):
+                await claim(make(), 0, 1)
+        await shard0.close()
+        await shard1.close()
+
+    asyncio.run(scenario())
+
+
+def test_incomplete_backend_fails_at_instantiation():
+    class Partial(app.Storage):
+        async def open(self):
+            pass
+
+    with pytest.raises(TypeError, match="abstract"):
+        Partial()
@@ -0,0 +1,104 @@
+# tests/test_write_queue.py
+# 写队列：同批操作一个事务提交，失败只回滚自己的 SAVEPOINT，stop() 提交已排队的写入
+import asyncio
+import sqlite3
+
+from conftest import app, sqlite_storage
+
+
+def insert(action: str, fail: bool = False):
+    async def op(db):
+        cur = await db.execute(
+            "INSERT INTO admin_logs (chat_id, admin_id, action, details, created_at) VALUES (1, 1, ?, '', '')", (action,))
+        if fail:
+            raise ValueError(action)
+        return cur.lastrowid
+
+    return op
+
+
+def logged(path: str) -> list:
+    conn = sqlite3.connect(path)
+    rows = [r[0] for r in conn.execute("SELECT action FROM admin_logs ORDER BY id")]
+    conn.close()
+    return rows
+
+
+def run_queue(path: str, scenario, **kwargs):
+    """打开 path 上的连接池后，用一个单独的 WriteQueue 运行 scenario(queue)"""
+    async def main():
+        storage = sqlite_storage(path)
+        await storage.open()
+        try:
+            return await scenario(app.WriteQueue(**kwargs))
+        finally:
+            await storage.close()
+
+    return asyncio.run(main())
+
+
+def test_batch_commits_once(tmp_path):
+    statements = []
+
+    async def scenario(queue):
+        await app.db_pool.set_trace_callback(statements.append)
+        queue.start()
+        try:
+            ids = await asyncio.gather(*(queue.submit(insert(f"a{i}")) for i in range(5)))
+        finally:
+            await queue.stop()
+            await app.db_pool.set_trace_callback(None)
+        assert len(set(ids)) == 5
+
+    path = str(tmp_path / "queue.db")
+    run_queue(path, scenario, delay=0.05)
+    assert statements.count("BEGIN") == 1
+    assert statements.count("SAVEPOINT write_op") == 5
+    assert logged(path) == [f"a{i}" for i in range(5)]
+
+
+def test_failing_op_rolls_back_only_itself(tmp_path):
+    async def scenario(queue):
+        queue.start()
+        try:
+            return await asyncio.gather(queue.submit(insert("ok1")), queue.submit(insert("bad", fail=True)),
+                                        queue.submit(insert("ok2")), return_exceptions=True)
+        finally:
+            await queue.stop()
+
+    path = str(tmp_path / "queue.db")
+    first, error, second = run_queue(path, scenario, delay=0.05)
+    assert isinstance(error, ValueError) and str(error) == "bad"
+    assert isinstance(first, int) and isinstance(second, int)
+    assert logged(path) == ["ok1", "ok2"]
+
+
+def test_stop_flushes_queued_writes(tmp_path):
+    async def scenario(queue):
+        queue.start()
+        # 远大于用例时长的攒批延迟：只有 stop() 才会触发提交
+        tasks = [asyncio.create_task(queue.submit(insert(f"q{i}"))) for i in range(3)]
+        await asyncio.sleep(0.01)
+        assert not any(t.done() for t in tasks)
+        await queue.stop()
+        assert all(t.done() and not t.exception() for t in tasks)
+        # 停止后的写入不再排队，直接提交
+        await queue.submit(insert("after"))
+
+    path = str(tmp_path / "queue.db")
+    run_queue(path, scenario, delay=60)
+    assert logged(path) == ["q0", "q1", "q2", "after"]
+
+
+def test_stop_before_writer_task_runs(tmp_path):
+    async def scenario(queue):
+        queue.start()
+        await queue.stop()          # 中间没有让出事件循环，写入任务还没开始运行
+        await queue.stop()
+        assert queue.pending() == 0
+
+    run_queue(str(tmp_path / "queue.db"), scenario)
+
+
+def test_stop_without_start():
+    asyncio.run(app.WriteQueue().stop())
@@ -0,0 +1,227 @@
+# webhook_loadtest.py
+# webhook 模式压测工具：向机器人的 webhook 地址并发 POST 合成 update，统计吞吐与延迟，全程不连 Telegram。
+#
+# 用法（本地一键：起假 Bot API + 以 webhook 模式启动机器人 + 压测）:
+#   python webhook_loadtest.py --spawn --updates 5000 --concurrency 100
+# 压测已部署在入口后面的机器人（机器人需以 TELEGRAM_API_SERVER 指向 --fake-api 端口，否则回复会发往真实 Telegram）:
+#   python webhook_loadtest.py --url https://bot.example.com/webhook --secret xxx --fake-api 8081
+#
+# - 每个合成用户依次发送：上班打卡 → 抽烟开始 → 回座 → 今日统计 → 下班签退
+# - “接收”指 webhook 返回 200 的速度；“处理”指假 Bot API 收到的回复请求数（每条 update 一条回复）
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+from time import monotonic, time as unix_time
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, web
+
+USER_SCRIPT = ["🏁 上班打卡", "🚬 抽烟开始", "💺 回座", "📊 今日统计", "🏁 下班签退"]
+BOT_ID = 1000000
+
+
+# ---------------------------
+# 假 Bot API：对所有方法返回成功，并统计调用次数
+# ---------------------------
+class FakeBotAPI:
+    def __init__(self):
+        self.calls = {}
+        self.replies = 0
+        self.message_id = 0
+        self.replied = asyncio.Event()
+        self.expected_replies = 0
+
+    def result_for(self, method: str, params: dict):
+        method = method.lower()
+        chat_id = int(params.get("chat_id") or 0)
+        if method == "getme":
+            return {"id": BOT_ID, "is_bot": True, "first_name": "checkin", "username": "checkin_bot"}
+        if method in ("sendmessage", "sendphoto", "senddocument"):
+            self.message_id += 1
+            self.replies += 1
+            if self.replies >= self.expected_replies:
+                self.replied.set()
+            return {"message_id": self.message_id, "date": int(unix_time()),
+                    "chat": {"id": chat_id, "type": "supergroup", "title": f"load {chat_id}"}}
+        if method == "getchatmember":
+            user_id = int(params.get("user_id") or 0)
+            return {"status": "member", "user": {"id": user_id, "is_bot": False, "first_name": f"u{user_id}"}}
+        if method == "getchat":
+            return {"id": chat_id, "type": "supergroup", "title": f"load {chat_id}"}
+        return True
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        return web.json_response({"ok": True, "result": self.result_for(method, params)})
+
+    async def start(self, port: int) -> web.AppRunner:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        return runner
+
+
+# ---------------------------
+# 合成 update
+# ---------------------------
+def make_update(update_id: int, chat_id: int, user_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(unix_time()),
+            "chat": {"id": chat_id, "type": "supergroup", "title": f"load {chat_id}"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"u{user_id}", "language_code": "zh"},
+            "text": text,
+        },
+    }
+
+def build_updates(total: int, chats: int, users: int):
+    """按用户轮转生成 update；同一用户的动作严格按 USER_SCRIPT 顺序出现"""
+    updates = []
+    step = 0
+    while len(updates) < total:
+        text = USER_SCRIPT[step % len(USER_SCRIPT)]
+        for u in range(users):
+            if len(updates) >= total:
+                break
+            chat_id = -1000000000000 - (u % chats)
+            updates.append(make_update(len(updates) + 1, chat_id, 10000 + u, text))
+        step += 1
+    return updates
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+async def post_updates(url: str, secret: str, updates, concurrency: int):
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for update in updates:
+        queue.put_nowait(update)
+
+    async with ClientSession(connector=TCPConnector(limit=concurrency), timeout=ClientTimeout(total=30)) as session:
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                update = queue.get_nowait()
+                started = monotonic()
+                try:
+                    async with session.post(url, json=update, headers=headers) as resp:
+                        await resp.read()
+                        if resp.status != 200:
+                            errors += 1
+                except Exception:
+                    errors += 1
+                latencies.append(monotonic() - started)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+async def wait_http(url: str, timeout: float):
+    deadline = monotonic() + timeout
+    async with ClientSession(timeout=ClientTimeout(total=2)) as session:
+        while monotonic() < deadline:
+            try:
+                async with session.get(url) as resp:
+                    await resp.read()
+                    return
+            except Exception:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"等待 {url} 超时")
+
+
+def spawn_bot(args, db_dir: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "BOT_TOKEN": env.get("BOT_TOKEN") or f"{BOT_ID}:loadtest",
+        "TELEGRAM_API_SERVER": f"http://127.0.0.1:{args.fake_api}",
+        "WEBHOOK_URL": f"http://127.0.0.1:{args.port}",
+        "WEBHOOK_HOST": "127.0.0.1",
+        "WEBHOOK_PORT": str(args.port),
+        "WEBHOOK_PATH": "/webhook",
+        "WEBHOOK_SECRET": args.secret,
+        "DB_PATH": os.path.join(db_dir, "loadtest.db"),
+        "OUTBOUND_RATE_LIMIT": "1" if args.rate_limit else "0",
+    })
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "telegram_checkin_pro.py")
+    log = open(os.path.join(db_dir, "bot.log"), "wb")
+    cmd = [sys.executable, script, "webhook", "--shards", str(args.shards)]
+    return subprocess.Popen(cmd, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+async def run(args):
+    fake = FakeBotAPI()
+    fake_runner = await fake.start(args.fake_api) if args.fake_api else None
+    proc = None
+    db_dir = tempfile.mkdtemp(prefix="checkin_loadtest_")
+    try:
+        if args.spawn:
+            args.url = f"http://127.0.0.1:{args.port}/webhook"
+            proc = spawn_bot(args, db_dir)
+            await wait_http(args.url, timeout=30)
+
+        updates = build_updates(args.updates, args.chats, args.users)
+        fake.expected_replies = fake.replies + len(updates)
+        started = monotonic()
+        latencies, errors = await post_updates(args.url, args.secret, updates, args.concurrency)
+        accepted = monotonic() - started
+
+        print(f"update 数: {len(updates)}，并发: {args.concurrency}，失败: {errors}")
+        print(f"接收: {accepted:.2f}s，{len(updates) / accepted:.0f} upd/s，"
+              f"p50 {percentile(latencies, 0.5) * 1000:.1f}ms，p99 {percentile(latencies, 0.99) * 1000:.1f}ms")
+
+        if fake_runner is not None:
+            try:
+                await asyncio.wait_for(fake.replied.wait(), timeout=args.drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+            handled = monotonic() - started
+            replies = fake.replies - (fake.expected_replies - len(updates))
+            print(f"处理: {replies}/{len(updates)} 条回复，{handled:.2f}s，{replies / handled:.0f} upd/s")
+            print("Bot API 调用: " + ", ".join(f"{k}={v}" for k, v in sorted(fake.calls.items())))
+    finally:
+        if proc is not None:
+            proc.send_signal(signal.SIGINT)  # 走机器人的正常退出流程（落盘写队列、关闭子进程池）
+            proc.wait(timeout=30)
+            print(f"机器人日志: {os.path.join(db_dir, 'bot.log')}")
+        if fake_runner is not None:
+            await fake_runner.cleanup()
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="webhook 模式压测")
+    parser.add_argument("--url", default="http://127.0.0.1:8080/webhook", help="机器人 webhook 地址")
+    parser.add_argument("--secret", default="loadtest-secret", help="WEBHOOK_SECRET，为空则不带校验头")
+    parser.add_argument("--updates", type=int, default=2000, help="发送的 update 总数")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发连接数")
+    parser.add_argument("--chats", type=int, default=20, help="合成群数")
+    parser.add_argument("--users", type=int, default=400, help="合成用户数（平均分布到各群）")
+    parser.add_argument("--fake-api", type=int, default=8081, help="假 Bot API 监听端口，0 表示不启动")
+    parser.add_argument("--spawn", action="store_true", help="在本地以 webhook 模式启动机器人（临时数据库）")
+    parser.add_argument("--port", type=int, default=8080, help="--spawn 时机器人监听的端口")
+    parser.add_argument("--shards", type=int, default=0, help="--spawn 时机器人的分片数（>1 为分片模式）")
+    parser.add_argument("--rate-limit", action="store_true",
+                        help="--spawn 时保留出站限速（默认关闭，否则测到的是 Telegram 限速而不是机器人本身）")
+    parser.add_argument("--drain-timeout", type=float, default=60, help="等待回复全部发出的最长秒数")
+    args = parser.parse_args(argv)
+    if args.spawn and not args.fake_api:
+        parser.error("--spawn 需要 --fake-api，否则机器人会连接真实 Telegram")
+    return args
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args(sys.argv[1:])))